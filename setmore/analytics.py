@@ -0,0 +1,326 @@
+#analytics.py
+import numpy as np
+
+MINUTES_PER_HOUR = 60
+HOURS_PER_DAY = 24
+DAYS_PER_WEEK = 7
+
+class SetmoreAnalytics:
+	"""
+	Staff utilization and availability analytics backed by NumPy arrays.
+
+	Appointments and available time slots are stored as parallel arrays of staff index,
+	start minute (minutes since 1970-01-01) and duration in minutes, so every statistic is
+	computed with vectorized operations instead of looping over lists of dicts.
+
+	Booked minutes come from appointments, free minutes from available time slots. Since
+	Setmore only returns slots that are still open, capacity is booked + free minutes.
+	Overlapping intervals for the same staff member (double bookings, overlapping slots)
+	are merged before counting, so a minute is never counted twice.
+
+	All times must be in the same timezone before they are combined. Setmore returns appointment
+	times in UTC while time slots are in the staff's local time, so pass offset_minutes to both
+	loaders to bring them together. A single fixed offset is wrong across daylight saving
+	changes. For data that spans a change, pass one offset per appointment or load each period
+	separately with its own offset.
+
+	:param staff_keys: (optional) List of staff keys, or the staff dicts returned by get_all_staff(), to index up front. Unknown keys are added as they are seen.
+	"""
+	def __init__(self, staff_keys=None):
+		self.staff_keys = []
+		self.staff_index = {}
+		# Added chunks are only concatenated when the arrays are next read, so many small add_* calls stay linear.
+		self._appointment_chunks = []
+		self._slot_chunks = []
+		self._booked_heatmap = None
+		self._free_heatmap = None
+
+		if staff_keys:
+			for key in dict.fromkeys(staff['key'] if isinstance(staff, dict) else staff for staff in staff_keys):
+				self._register_staff(key)
+
+	def _register_staff(self, key):
+		""" Return the index of a staff key, appending it to self.staff_keys if it is new """
+		if key not in self.staff_index:
+			self.staff_index[key] = len(self.staff_keys)
+			self.staff_keys.append(key)
+		return self.staff_index[key]
+
+	def _index_staff(self, keys):
+		""" Map an array of staff keys to staff indexes, registering unseen keys in the order they are first seen """
+		unique_keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+		# np.unique sorts the keys, so register them by first occurrence to keep self.staff_keys in input order.
+		for position in np.argsort(first, kind='stable').tolist():
+			self._register_staff(unique_keys[position].item())
+		lookup = np.array([self.staff_index[key] for key in unique_keys.tolist()], dtype=np.int64)
+		return lookup[inverse.reshape(-1)]
+
+	@property
+	def appointment_staff(self):
+		return _concatenate_chunks(self._appointment_chunks)[0]
+
+	@property
+	def appointment_start(self):
+		return _concatenate_chunks(self._appointment_chunks)[1]
+
+	@property
+	def appointment_duration(self):
+		return _concatenate_chunks(self._appointment_chunks)[2]
+
+	@property
+	def slot_staff(self):
+		return _concatenate_chunks(self._slot_chunks)[0]
+
+	@property
+	def slot_start(self):
+		return _concatenate_chunks(self._slot_chunks)[1]
+
+	@property
+	def slot_duration(self):
+		return _concatenate_chunks(self._slot_chunks)[2]
+
+	def add_appointment_arrays(self, staff, start, duration):
+		"""
+		Add appointments that are already in array form. Fastest way to load large data sets.
+
+		:param staff: Array of staff indexes (positions in self.staff_keys).
+		:param start: Array of start times in minutes since 1970-01-01.
+		:param duration: Array of durations in minutes.
+		"""
+		self._appointment_chunks.append(_as_interval_arrays(staff, start, duration, len(self.staff_keys)))
+		self._booked_heatmap = None
+
+	def add_appointments(self, appointments, offset_minutes=0):
+		"""
+		Add appointments as returned by SetmoreAppointments.get_appointments().
+
+		:param appointments: List of appointment dicts, or the response data dict containing an 'appointments' list.
+		:param offset_minutes: (optional) Minutes added to every start time, e.g. -300 to shift UTC times into US Eastern standard time. Either a single value or an array with one offset per appointment. Defaults to 0.
+		"""
+		if isinstance(appointments, dict):
+			appointments = appointments.get('appointments', [])
+		if not appointments:
+			return
+
+		# Setmore times look like '2023-06-28T15:00Z'. The first 16 characters parse as datetime64[m].
+		start = np.array([appointment['start_time'][:16] for appointment in appointments], dtype='datetime64[m]')
+		end = np.array([appointment['end_time'][:16] for appointment in appointments], dtype='datetime64[m]')
+		keys = np.array([appointment['staff_key'] for appointment in appointments])
+
+		duration = (end - start).astype(np.int64)
+		start = start.astype(np.int64) + offset_minutes
+		self.add_appointment_arrays(self._index_staff(keys), start, duration)
+
+	def add_slot_arrays(self, staff, start, duration):
+		"""
+		Add available time slots that are already in array form.
+
+		:param staff: Array of staff indexes (positions in self.staff_keys).
+		:param start: Array of slot start times in minutes since 1970-01-01.
+		:param duration: Array of slot lengths in minutes, or a single length for all slots.
+		"""
+		self._slot_chunks.append(_as_interval_arrays(staff, start, duration, len(self.staff_keys)))
+		self._free_heatmap = None
+
+	def add_time_slots(self, staff_key, time_slots, slot_duration, offset_minutes=0):
+		"""
+		Add available time slots as returned by SetmoreTimeSlots.get_all_available_time_slots().
+
+		Request the slots with past=True. By default get_all_available_time_slots() drops every slot
+		earlier than now, so historical dates come back with no free minutes and utilization is too high.
+
+		:param staff_key: The staff key the slots were requested for.
+		:param time_slots: List of slot strings formatted like '2023/07/12 14:30:00 pm'.
+		:param slot_duration: Length of each slot in minutes, usually the service duration.
+		:param offset_minutes: (optional) Minutes added to every start time. Slots are in local time, so leave at 0 when appointments were shifted to local time, or use e.g. 300 to shift US Eastern standard time to UTC. Defaults to 0.
+		"""
+		if not time_slots:
+			return
+
+		# '2023/07/12 14:30:00 pm' -> '2023-07-12T14:30'. Hours are already 24 hour so the am/pm suffix is ignored.
+		start = np.array([slot[:10].replace('/', '-') + 'T' + slot[11:16] for slot in time_slots], dtype='datetime64[m]')
+		staff = self._register_staff(staff_key)
+		self.add_slot_arrays(np.full(len(start), staff), start.astype(np.int64) + offset_minutes, slot_duration)
+
+	def booked_minutes(self):
+		"""
+		Booked minutes per staff member.
+
+		:return: Array of shape (n_staff,) ordered like self.staff_keys.
+		"""
+		return self.booked_heatmap().sum(axis=(1, 2))
+
+	def free_minutes(self):
+		"""
+		Free (still bookable) minutes per staff member.
+
+		:return: Array of shape (n_staff,) ordered like self.staff_keys.
+		"""
+		return self.free_heatmap().sum(axis=(1, 2))
+
+	def utilization(self):
+		"""
+		Share of capacity that is booked per staff member, booked / (booked + free).
+
+		:return: Array of shape (n_staff,). NaN for staff without any booked or free minutes.
+		"""
+		return _ratio(self.booked_minutes(), self.free_minutes())
+
+	def booked_heatmap(self):
+		"""
+		Booked minutes per staff member, weekday and hour of day.
+
+		:return: Array of shape (n_staff, 7, 24). Weekday 0 is Monday.
+		"""
+		if self._booked_heatmap is None or len(self._booked_heatmap) != len(self.staff_keys):
+			self._booked_heatmap = _heatmap(self.appointment_staff, self.appointment_start, self.appointment_duration, len(self.staff_keys))
+		return self._booked_heatmap.copy()
+
+	def free_heatmap(self):
+		"""
+		Free minutes per staff member, weekday and hour of day.
+
+		:return: Array of shape (n_staff, 7, 24). Weekday 0 is Monday.
+		"""
+		if self._free_heatmap is None or len(self._free_heatmap) != len(self.staff_keys):
+			self._free_heatmap = _heatmap(self.slot_staff, self.slot_start, self.slot_duration, len(self.staff_keys))
+		return self._free_heatmap.copy()
+
+	def occupancy_heatmap(self):
+		"""
+		Utilization per staff member, weekday and hour of day.
+
+		:return: Array of shape (n_staff, 7, 24) with values between 0 and 1. NaN where there is no capacity.
+		"""
+		return _ratio(self.booked_heatmap(), self.free_heatmap())
+
+	def hourly_utilization(self):
+		"""
+		Utilization per staff member and hour of day, combined over all weekdays.
+
+		:return: Array of shape (n_staff, 24). NaN where there is no capacity.
+		"""
+		return _ratio(self.booked_heatmap().sum(axis=1), self.free_heatmap().sum(axis=1))
+
+	def peak_hours(self, top=3):
+		"""
+		Busiest hours of the day per staff member, ranked by booked minutes.
+
+		:param top: (optional) Number of hours to return per staff member. Defaults to 3.
+		:return: Dict keyed by staff key with a list of dicts holding 'hour', 'booked_minutes' and 'utilization'.
+		"""
+		if top < 1:
+			raise ValueError('top must be at least 1')
+
+		booked = self.booked_heatmap().sum(axis=1)
+		utilization = self.hourly_utilization()
+		# Stable sort on negated minutes keeps earlier hours first on ties.
+		order = np.argsort(-booked, axis=1, kind='stable')[:, :top]
+		minutes = np.take_along_axis(booked, order, axis=1)
+		ratios = np.take_along_axis(utilization, order, axis=1)
+
+		return {
+			key: [
+				{'hour': hour, 'booked_minutes': booked_minutes, 'utilization': ratio}
+				for hour, booked_minutes, ratio in zip(order[i].tolist(), minutes[i].tolist(), ratios[i].tolist())
+				if booked_minutes > 0
+			]
+			for i, key in enumerate(self.staff_keys)
+		}
+
+	def summary(self):
+		"""
+		Booked minutes, free minutes, utilization and peak hour per staff member.
+
+		:return: Dict keyed by staff key.
+		"""
+		booked_hourly = self.booked_heatmap().sum(axis=1)
+		free_hourly = self.free_heatmap().sum(axis=1)
+		booked = booked_hourly.sum(axis=1)
+		free = free_hourly.sum(axis=1)
+		utilization = _ratio(booked, free)
+		peak_hour = np.argmax(booked_hourly, axis=1)
+
+		return {
+			key: {
+				'booked_minutes': int(booked[i]),
+				'free_minutes': int(free[i]),
+				'utilization': float(utilization[i]),
+				'peak_hour': int(peak_hour[i]) if booked[i] > 0 else None
+			}
+			for i, key in enumerate(self.staff_keys)
+		}
+
+def _as_interval_arrays(staff, start, duration, n_staff):
+	staff = np.asarray(staff, dtype=np.int64).reshape(-1)
+	start = np.asarray(start, dtype=np.int64).reshape(-1)
+	duration = np.broadcast_to(np.asarray(duration, dtype=np.int64), start.shape)
+
+	if staff.shape != start.shape:
+		raise ValueError('staff, start and duration must have the same length')
+	if staff.size and (staff.min() < 0 or staff.max() >= n_staff):
+		raise ValueError('staff indexes must refer to known staff_keys')
+	if (duration < 0).any():
+		raise ValueError('durations must not be negative')
+	return staff, start, duration.copy()
+
+def _concatenate_chunks(chunks):
+	""" Concatenate the (staff, start, duration) chunks in place and return the combined arrays """
+	if not chunks:
+		return tuple(np.empty(0, dtype=np.int64) for _ in range(3))
+	if len(chunks) > 1:
+		chunks[:] = [tuple(np.concatenate(arrays) for arrays in zip(*chunks))]
+	return chunks[0]
+
+def _merge_intervals(staff, start, end):
+	"""
+	Merge overlapping [start, end) intervals per staff member.
+	Returns staff, start and end arrays of the merged, non overlapping intervals.
+	"""
+	keep = end > start
+	staff, start, end = staff[keep], start[keep], end[keep]
+	if not start.size:
+		return staff, start, end
+
+	# Shift every staff member into its own range so one sort and a single running maximum cover all groups.
+	span = int(end.max() - start.min()) + 1
+	shift = staff * span - start.min()
+	shifted_start = start + shift
+	order = np.argsort(shifted_start)
+	staff, start, shift, shifted_start = staff[order], start[order], shift[order], shifted_start[order]
+	shifted_end = np.maximum.accumulate(end[order] + shift)
+
+	new_group = np.empty(start.size, dtype=bool)
+	new_group[0] = True
+	new_group[1:] = shifted_start[1:] > shifted_end[:-1]
+	first = np.flatnonzero(new_group)
+	last = np.append(first[1:], start.size) - 1
+
+	return staff[first], start[first], shifted_end[last] - shift[last]
+
+def _heatmap(staff, start, duration, n_staff):
+	""" Sum minutes covered by the intervals into (n_staff, weekday, hour) buckets """
+	staff, start, end = _merge_intervals(staff, start, start + duration)
+	if not start.size:
+		return np.zeros((n_staff, DAYS_PER_WEEK, HOURS_PER_DAY), dtype=np.int64)
+
+	# Split every interval into one piece per hour it touches.
+	first_hour = start // MINUTES_PER_HOUR
+	pieces = (end - 1) // MINUTES_PER_HOUR - first_hour + 1
+	row = np.repeat(np.arange(start.size), pieces)
+	offset = np.arange(row.size) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+	hour = first_hour[row] + offset
+	minutes = (np.minimum(end[row], (hour + 1) * MINUTES_PER_HOUR)
+		- np.maximum(start[row], hour * MINUTES_PER_HOUR))
+
+	# 1970-01-01 was a Thursday, shift by 3 so Monday is weekday 0.
+	day = hour // HOURS_PER_DAY
+	weekday = (day + 3) % DAYS_PER_WEEK
+	bucket = (staff[row] * DAYS_PER_WEEK + weekday) * HOURS_PER_DAY + hour % HOURS_PER_DAY
+	counts = np.bincount(bucket, weights=minutes, minlength=n_staff * DAYS_PER_WEEK * HOURS_PER_DAY)
+	return counts.astype(np.int64).reshape(n_staff, DAYS_PER_WEEK, HOURS_PER_DAY)
+
+def _ratio(booked, free):
+	capacity = booked + free
+	with np.errstate(divide='ignore', invalid='ignore'):
+		return np.where(capacity > 0, booked / capacity, np.nan)
@@ -0,0 +1,151 @@
+#test_analytics.py
+from datetime import datetime
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from setmore.analytics import SetmoreAnalytics, _heatmap
+
+def minute(text):
+	""" Minutes since 1970-01-01 for a 'YYYY-MM-DDTHH:MM' string """
+	return int(np.datetime64(text, 'm').astype(np.int64))
+
+def appointment(staff_key, start_time, end_time):
+	return {'staff_key': staff_key, 'start_time': start_time + 'Z', 'end_time': end_time + 'Z'}
+
+def slot_string(text):
+	""" Format a slot exactly like SetmoreTimeSlots.get_all_available_time_slots() """
+	return datetime.strptime(text, '%Y-%m-%dT%H:%M').strftime("%Y/%m/%d %H:%M:%S %p").lower()
+
+def brute_force_heatmap(staff, start, duration, n_staff):
+	occupied = set()
+	for s, b, d in zip(staff.tolist(), start.tolist(), duration.tolist()):
+		occupied.update((s, m) for m in range(b, b + d))
+	expected = np.zeros((n_staff, 7, 24), dtype=np.int64)
+	for s, m in occupied:
+		hour = m // 60
+		expected[s, (hour // 24 + 3) % 7, hour % 24] += 1
+	return expected
+
+def test_heatmap_matches_brute_force():
+	rng = np.random.default_rng(0)
+	for _ in range(200):
+		n = int(rng.integers(1, 40))
+		staff = rng.integers(0, 3, n)
+		start = minute('2024-01-06T20:00') + rng.integers(0, 3 * 1440, n)
+		duration = rng.integers(0, 240, n)
+		assert (_heatmap(staff, start, duration, 3) == brute_force_heatmap(staff, start, duration, 3)).all()
+
+def test_overlapping_appointments_are_counted_once():
+	analytics = SetmoreAnalytics()
+	analytics.add_appointments([
+		appointment('s1', '2024-01-01T09:30', '2024-01-01T10:30'),
+		appointment('s1', '2024-01-01T10:00', '2024-01-01T11:00'),
+	])
+	heatmap = analytics.booked_heatmap()
+	assert analytics.booked_minutes().tolist() == [90]
+	assert heatmap[0, 0, 9:11].tolist() == [30, 60]
+
+def test_back_to_back_appointments():
+	analytics = SetmoreAnalytics()
+	analytics.add_appointments([
+		appointment('s1', '2024-01-01T09:00', '2024-01-01T10:00'),
+		appointment('s1', '2024-01-01T10:00', '2024-01-01T11:00'),
+	])
+	assert analytics.booked_minutes().tolist() == [120]
+	assert analytics.booked_heatmap()[0, 0, 9:11].tolist() == [60, 60]
+
+def test_same_times_for_different_staff_are_not_merged():
+	analytics = SetmoreAnalytics(['s1', 's2'])
+	analytics.add_appointments([
+		appointment('s1', '2024-01-01T09:00', '2024-01-01T10:00'),
+		appointment('s2', '2024-01-01T09:30', '2024-01-01T10:00'),
+	])
+	assert analytics.booked_minutes().tolist() == [60, 30]
+
+def test_appointment_crossing_midnight():
+	analytics = SetmoreAnalytics()
+	# 2024-01-01 is a Monday.
+	analytics.add_appointments([appointment('s1', '2024-01-01T23:30', '2024-01-02T00:30')])
+	heatmap = analytics.booked_heatmap()
+	assert heatmap[0, 0, 23] == 30
+	assert heatmap[0, 1, 0] == 30
+	assert heatmap.sum() == 60
+
+def test_appointment_crossing_week_boundary():
+	analytics = SetmoreAnalytics()
+	analytics.add_appointments([appointment('s1', '2024-01-07T23:30', '2024-01-08T01:15')])
+	heatmap = analytics.booked_heatmap()
+	assert heatmap[0, 6, 23] == 30
+	assert heatmap[0, 0, 0:2].tolist() == [60, 15]
+	assert heatmap.sum() == 105
+
+def test_epoch_is_a_thursday():
+	assert _heatmap(np.array([0]), np.array([0]), np.array([60]), 1)[0, 3, 0] == 60
+
+def test_add_appointments_parses_response_data():
+	analytics = SetmoreAnalytics([{'key': 's1', 'first_name': 'Ann'}])
+	analytics.add_appointments({'appointments': [appointment('s1', '2024-01-01T09:15', '2024-01-01T10:00')]}, offset_minutes=-60)
+	assert analytics.staff_keys == ['s1']
+	assert analytics.appointment_start.tolist() == [minute('2024-01-01T08:15')]
+	assert analytics.appointment_duration.tolist() == [45]
+
+def test_add_time_slots_parses_slot_strings():
+	analytics = SetmoreAnalytics()
+	slots = [slot_string('2024-01-01T09:00'), slot_string('2024-01-01T14:30'), slot_string('2024-01-01T23:45')]
+	assert slots[1] == '2024/01/01 14:30:00 pm'
+	analytics.add_time_slots('s1', slots, 30, offset_minutes=300)
+	assert analytics.slot_start.tolist() == [
+		minute('2024-01-01T14:00'), minute('2024-01-01T19:30'), minute('2024-01-02T04:45')
+	]
+	assert analytics.slot_duration.tolist() == [30, 30, 30]
+
+def test_utilization_and_peak_hours():
+	analytics = SetmoreAnalytics(['s1', 's2'])
+	analytics.add_appointments([appointment('s1', '2024-01-01T10:00', '2024-01-01T11:00')])
+	analytics.add_time_slots('s1', [slot_string('2024-01-01T11:00'), slot_string('2024-01-01T11:30')], 60)
+	assert analytics.free_minutes().tolist() == [90, 0]
+	utilization = analytics.utilization()
+	assert utilization[0] == pytest.approx(0.4)
+	assert np.isnan(utilization[1])
+	assert analytics.peak_hours(top=2) == {
+		's1': [{'hour': 10, 'booked_minutes': 60, 'utilization': 1.0}],
+		's2': []
+	}
+	with pytest.raises(ValueError):
+		analytics.peak_hours(top=0)
+
+def test_chunks_added_after_reading_are_included():
+	analytics = SetmoreAnalytics(['s1'])
+	analytics.add_slot_arrays([0], [minute('2024-01-01T09:00')], 30)
+	assert analytics.free_minutes().tolist() == [30]
+	analytics.add_slot_arrays([0], [minute('2024-01-01T10:00')], 30)
+	assert analytics.free_minutes().tolist() == [60]
+
+def test_million_rows():
+	n = 1_000_000
+	analytics = SetmoreAnalytics([f's{i}' for i in range(10)])
+	staff = np.arange(n) % 10
+	# Back to back 30 minute appointments per staff member, so totals are known exactly.
+	start = minute('2024-01-01T00:00') + (np.arange(n) // 10) * 30
+	analytics.add_appointment_arrays(staff, start, 30)
+	assert analytics.booked_minutes().tolist() == [n // 10 * 30] * 10
+	assert analytics.booked_heatmap().sum() == n * 30
+
+def test_staff_keys_keep_given_order():
+	analytics = SetmoreAnalytics(['b', 'a', 'b'])
+	assert analytics.staff_keys == ['b', 'a']
+	analytics.add_appointment_arrays([0], [minute('2024-01-01T09:00')], 45)
+	assert analytics.booked_minutes().tolist() == [45, 0]
+	assert analytics.summary()['b']['booked_minutes'] == 45
+
+def test_new_staff_keys_are_added_in_first_seen_order():
+	analytics = SetmoreAnalytics(['m'])
+	analytics.add_appointments([
+		appointment('z', '2024-01-01T09:00', '2024-01-01T10:00'),
+		appointment('a', '2024-01-01T09:00', '2024-01-01T09:30'),
+		appointment('z', '2024-01-01T11:00', '2024-01-01T11:15'),
+	])
+	assert analytics.staff_keys == ['m', 'z', 'a']
+	assert analytics.booked_minutes().tolist() == [0, 75, 30]